@@ -1,17 +1,27 @@
 import logging
 import os
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from http.server import BaseHTTPRequestHandler, HTTPServer
 import threading
 import asyncio
+from types import MappingProxyType
+from collections import OrderedDict
 from dotenv import load_dotenv
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
+    AIORateLimiter,
     Application,
+    ApplicationHandlerStop,
     CommandHandler,
     CallbackQueryHandler,
-    ContextTypes
+    ContextTypes,
+    TypeHandler
 )
 from telegram.helpers import escape_markdown
+from telegram.request import HTTPXRequest
+import telegram.request._requestdata
+import telegram.request._requestparameter
 from telegram.error import TelegramError
 from urllib.parse import quote
 
@@ -33,53 +43,78 @@ def run_web_server():
 # --- Configuration & Logger Setup ---
 load_dotenv()
 
-# Configure logging
+# Configure logging. File and stream writes happen on a background thread
+# fed through a queue, so log calls never block the event loop on disk I/O.
+_log_queue = queue.SimpleQueue()
+_log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+_file_handler = RotatingFileHandler('bot.log', maxBytes=10_000_000, backupCount=3)
+_file_handler.setFormatter(_log_formatter)
+_stream_handler = logging.StreamHandler()
+_stream_handler.setFormatter(_log_formatter)
+_log_listener = QueueListener(_log_queue, _file_handler, _stream_handler)
+_log_listener.start()
 logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     level=logging.INFO,
-    handlers=[
-        logging.FileHandler('bot.log'),
-        logging.StreamHandler()
-    ]
+    # Passthrough format: the listener's handlers apply the real format.
+    format='%(message)s',
+    handlers=[QueueHandler(_log_queue)]
 )
 logger = logging.getLogger(__name__)
 
 # --- Environment Variables ---
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 ADMIN_USERNAME = os.getenv("ADMIN_USERNAME")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
 
 if not TELEGRAM_BOT_TOKEN:
     logger.error("TELEGRAM_BOT_TOKEN environment variable is not set.")
     raise ValueError("TELEGRAM_BOT_TOKEN is required")
 
+if not ADMIN_USERNAME:
+    logger.error("ADMIN_USERNAME environment variable is not set.")
+    raise ValueError("ADMIN_USERNAME is required")
+
+# Target for admin notifications, built once instead of per request.
+ADMIN_CHAT = f"@{ADMIN_USERNAME}"
+
 # --- Course Data ---
+# Read-only after startup: features are tuples, derived strings are
+# precomputed below, and the whole mapping is wrapped in a MappingProxyType
+# so a handler can't mutate it by accident.
 COURSE_DATA = {
     "course_a": {
         "name": "Ordinary Group",
         "price": 30.00,
         "description": "Get Leaked content, daily updates ✅",
-        "features": ["Basic content access", "Daily updates"]
+        "features": ("Basic content access", "Daily updates")
     },
     "course_b": {
         "name": "Standard Group",
         "price": 50.00,
         "description": "Get premium content, daily updates ✅",
-        "features": ["Premium content access", "Daily updates", "Priority support"]
+        "features": ("Premium content access", "Daily updates", "Priority support")
     },
     "course_c": {
         "name": "Premium Group 👑",
         "price": 100.00,
         "description": "Get unlimited premium content, daily updates ✅",
-        "features": ["Unlimited content access", "Daily updates", "24/7 support", "Exclusive materials"]
+        "features": ("Unlimited content access", "Daily updates", "24/7 support", "Exclusive materials")
     }
 }
 
+for _course in COURSE_DATA.values():
+    _course["_features_bullets"] = "\n• ".join(_course["features"])
+    _course["_features_csv"] = ", ".join(_course["features"])
+    _course["_price_str"] = f"₹{_course['price']:.2f}"
+
+COURSE_DATA = MappingProxyType(COURSE_DATA)
+
 # --- Utility Functions ---
 def create_course_keyboard():
     """Create the main Group selection keyboard."""
     keyboard = [
         [InlineKeyboardButton(
-            f"{course['name']} (₹{int(course['price'])}.{int(round((course['price'] - int(course['price'])) * 100)):02d})",
+            f"{course['name']} ({course['_price_str']})",
             callback_data=f"select_course_{course_id}"
         )]
         for course_id, course in COURSE_DATA.items()
@@ -87,26 +122,26 @@ def create_course_keyboard():
     keyboard.append([InlineKeyboardButton("📸 Show Demo", url="https://t.me/+ukJYiqlkRLYzOTFl")])
     return InlineKeyboardMarkup(keyboard)
 
-def create_course_detail_keyboard(course_id):
-    """Create the keyboard for course details view with auto-filled admin contact."""
-    course = COURSE_DATA.get(course_id)
-    if not course:
-        return None
+def _create_course_detail_keyboard(course_id):
+    """Create the keyboard for course details view with auto-filled admin contact.
+
+    Only runs while _DETAIL_CACHE is built, so the URL-encoding and deep-link
+    assembly happen once per course at import instead of on every render.
+    """
+    course = COURSE_DATA[course_id]
 
-    course_name = quote(course['name'])
-    price = course['price']
-    features = "|".join([quote(f) for f in course['features']])
+    name_q = quote(course['name'])
+    features_q = "|".join(quote(f) for f in course['features'])
 
-    deep_link = f"https://t.me/{ADMIN_USERNAME}?text="
-    message_text = (
+    deep_link = (
+        f"https://t.me/{ADMIN_USERNAME}?text="
         f"Hello Admin,%0A%0A"
         f"I'm interested in the following Group:%0A"
-        f"📘 Group: {course_name}%0A"
-        f"💰 Price: ₹{price}%0A"
-        f"📋 Features: {features}%0A%0A"
+        f"📘 Group: {name_q}%0A"
+        f"💰 Price: ₹{course['price']}%0A"
+        f"📋 Features: {features_q}%0A%0A"
         f"Please provide payment details."
     )
-    deep_link += message_text
 
     keyboard = [
         [InlineKeyboardButton("Contact Admin", url=deep_link)],
@@ -114,56 +149,128 @@ def create_course_detail_keyboard(course_id):
     ]
     return InlineKeyboardMarkup(keyboard)
 
+def _create_course_detail_text(course_id):
+    """Build the course details message shown when a Group is selected."""
+    course = COURSE_DATA[course_id]
+
+    return (
+        f"📘 {course['name']} 👑\n\n"
+        f"💰 Price: {course['_price_str']}\n\n"
+        f"📋 Features:\n• {course['_features_bullets']}\n\n"
+        f"📝 Description:\n{course['description']}"
+    )
+
+# COURSE_DATA and ADMIN_USERNAME are static, so build the keyboards and
+# detail texts once at import time instead of on every request.
+_MAIN_KEYBOARD = create_course_keyboard()
+_DETAIL_CACHE = {
+    course_id: (_create_course_detail_text(course_id), _create_course_detail_keyboard(course_id))
+    for course_id in COURSE_DATA
+}
+
 async def send_safe_message(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str, reply_markup=None, parse_mode=None):
+    if update.callback_query:
+        send = update.callback_query.edit_message_text
+    else:
+        send = update.message.reply_text
+
     try:
         if parse_mode == "MarkdownV2":
             escaped_text = escape_markdown(text, version=2)
-        elif parse_mode == "HTML":
-            escaped_text = text
         else:
             escaped_text = text
 
-        if update.callback_query:
-            if parse_mode:
-                await update.callback_query.edit_message_text(escaped_text, reply_markup=reply_markup, parse_mode=parse_mode)
-            else:
-                await update.callback_query.edit_message_text(escaped_text, reply_markup=reply_markup)
-        else:
-            if parse_mode:
-                await update.message.reply_text(escaped_text, reply_markup=reply_markup, parse_mode=parse_mode)
-            else:
-                await update.message.reply_text(escaped_text, reply_markup=reply_markup)
+        kwargs = {"reply_markup": reply_markup}
+        if parse_mode:
+            kwargs["parse_mode"] = parse_mode
+        await send(escaped_text, **kwargs)
     except TelegramError as e:
         logger.error(f"Error sending message: {e}")
         try:
-            if update.callback_query:
-                await update.callback_query.edit_message_text(text, reply_markup=reply_markup)
-            else:
-                await update.message.reply_text(text, reply_markup=reply_markup)
+            await send(text, reply_markup=reply_markup)
         except TelegramError as e:
             logger.error(f"Fallback message failed: {e}")
             if update.callback_query:
                 await update.callback_query.answer("Sorry, an error occurred. Please try again.")
 
+# --- JSON Serialization ---
+# Serialize Telegram request/response bodies with orjson instead of the
+# stdlib json module when available; it is a C-level (de)serializer that
+# cuts CPU on every API call. Falls back to the stdlib silently.
+try:
+    import orjson
+
+    class _OrjsonShim:
+        """Stdlib-json-compatible dumps/loads wrappers around orjson."""
+
+        @staticmethod
+        def dumps(obj, **kwargs):
+            return orjson.dumps(obj).decode()
+
+        @staticmethod
+        def loads(s, **kwargs):
+            return orjson.loads(s)
+
+    class BotRequest(HTTPXRequest):
+        """HTTPXRequest parsing Telegram responses with orjson."""
+
+        @staticmethod
+        def parse_json_payload(payload: bytes):
+            try:
+                return orjson.loads(payload)
+            except orjson.JSONDecodeError:
+                # Fall back to the lenient stdlib path (errors="replace").
+                return HTTPXRequest.parse_json_payload(payload)
+
+    # Outbound payloads are dumped via the module-level `json` reference in
+    # these two modules; swap it for the orjson shim.
+    telegram.request._requestdata.json = _OrjsonShim
+    telegram.request._requestparameter.json = _OrjsonShim
+except ImportError:
+    BotRequest = HTTPXRequest
+
+# --- Update Deduplication ---
+# Telegram redelivers updates when the getUpdates offset commit races with
+# slow handlers; remember recently seen update_ids so duplicates are dropped
+# before they reach the handlers.
+_SEEN_MAX = 1000
+_seen_updates: OrderedDict = OrderedDict()
+
+async def dedup_updates(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    update_id = update.update_id
+    if update_id in _seen_updates:
+        logger.info(f"Dropping duplicate update {update_id}")
+        raise ApplicationHandlerStop
+    _seen_updates[update_id] = None
+    if len(_seen_updates) > _SEEN_MAX:
+        _seen_updates.popitem(last=False)
+
 # --- Handler Functions ---
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     welcome_text = "🌟 Welcome to our Premium Bot 📚\n\nSelect a Group below to see its details:"
-    await send_safe_message(update, context, welcome_text, reply_markup=create_course_keyboard())
+    await send_safe_message(update, context, welcome_text, reply_markup=_MAIN_KEYBOARD)
 
 async def show_courses_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     menu_text = "🌟 Welcome to our Premium Bot 📚\n\nSelect a Group below to see its details:"
-    await send_safe_message(update, context, menu_text, reply_markup=create_course_keyboard())
+    await send_safe_message(update, context, menu_text, reply_markup=_MAIN_KEYBOARD)
 
 async def select_course(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # Bind repeatedly used globals and attributes to locals once; LOAD_FAST
+    # is cheaper than the LOAD_GLOBAL/LOAD_ATTR chains in this hot handler.
+    send = send_safe_message
+    gather = asyncio.gather
     try:
         query = update.callback_query
-        await query.answer()
+        answer = query.answer
 
         course_id = query.data.replace("select_course_", "")
         course = COURSE_DATA.get(course_id)
 
         if not course:
-            await send_safe_message(update, context, "Error: Group information not found.")
+            await gather(
+                answer(),
+                send(update, context, "Error: Group information not found.")
+            )
             return
 
         context.user_data['selected_course'] = {
@@ -173,21 +280,17 @@ async def select_course(update: Update, context: ContextTypes.DEFAULT_TYPE):
             'features': course['features']
         }
 
-        features = "\n• ".join(course['features'])
-        description = course['description']
-        price_text = f"₹{int(course['price'])}.{int(round((course['price'] - int(course['price'])) * 100)):02d}"
+        description_text, detail_keyboard = _DETAIL_CACHE[course_id]
 
-        description_text = (
-            f"📘 {course['name']} 👑\n\n"
-            f"💰 Price: {price_text}\n\n"
-            f"📋 Features:\n• {features}\n\n"
-            f"📝 Description:\n{description}"
+        # Answering the callback and editing the message are independent
+        # API calls; issuing them together hides one roundtrip of latency.
+        await gather(
+            answer(),
+            send(update, context, description_text, reply_markup=detail_keyboard)
         )
-
-        await send_safe_message(update, context, description_text, reply_markup=create_course_detail_keyboard(course_id))
     except Exception as e:
         logger.error(f"Error selecting Group: {e}")
-        await send_safe_message(update, context, "Sorry, an error occurred while processing your request.")
+        await send(update, context, "Sorry, an error occurred while processing your request.")
 
 async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.error(f"Update {update} caused error {context.error}")
@@ -195,15 +298,21 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await send_safe_message(update, context, "An error occurred. Please try again later.")
 
 async def contact_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # Same local-binding treatment as select_course; see comment there.
+    send = send_safe_message
+    gather = asyncio.gather
     try:
         query = update.callback_query
-        await query.answer()
+        answer = query.answer
 
         course_id = query.data.replace("contact_admin_", "")
         course = COURSE_DATA.get(course_id)
 
         if not course:
-            await send_safe_message(update, context, "Error: Group information not found.")
+            await gather(
+                answer(),
+                send(update, context, "Error: Group information not found.")
+            )
             return
 
         user = update.effective_user
@@ -213,31 +322,183 @@ async def contact_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
             f"New course inquiry from {user_info}:\n\n"
             f"📘 Group: {course['name']}\n"
             f"💰 Price: ₹{course['price']}\n"
-            f"📋 Features: {', '.join(course['features'])}"
+            f"📋 Features: {course['_features_csv']}"
         )
 
-        await context.bot.send_message(chat_id=f"@{ADMIN_USERNAME}", text=message_text)
-        await send_safe_message(update, context, "Your request has been sent to the admin. They will contact you shortly with payment details.")
+        # The admin notification is queued for the background flusher; the
+        # callback answer and user-facing reply run concurrently.
+        notify_queue.put_nowait(message_text)
+        await gather(
+            answer(),
+            send(update, context, "Your request has been sent to the admin. They will contact you shortly with payment details.")
+        )
     except Exception as e:
         logger.error(f"Error contacting admin: {e}")
-        await send_safe_message(update, context, "Sorry, an error occurred while contacting the admin.")
+        await send(update, context, "Sorry, an error occurred while contacting the admin.")
+
+# --- Admin Notification Batching ---
+# A burst of inquiries (e.g. a broadcast link going viral) would otherwise
+# fire one send_message to the admin per click and trip Telegram's per-chat
+# rate limit. Handlers enqueue the text (O(1), non-blocking); a background
+# task flushes the queue once a second as a single coalesced message.
+_NOTIFY_FLUSH_INTERVAL = 1.0
+_NOTIFY_BATCH_MAX = 20
+_NOTIFY_SEPARATOR = "\n\n---\n\n"
+# Telegram rejects messages longer than 4096 characters, so batches are
+# also capped by accumulated length and split into multiple sends if needed.
+_NOTIFY_MAX_LEN = 4096
+notify_queue: asyncio.Queue = asyncio.Queue()
+
+async def _flush_notifications(bot):
+    if notify_queue.empty():
+        return
+    messages = []
+    while len(messages) < _NOTIFY_BATCH_MAX and not notify_queue.empty():
+        messages.append(notify_queue.get_nowait())
+
+    batch = []
+    length = 0
+    for text in messages:
+        added = len(text) + (len(_NOTIFY_SEPARATOR) if batch else 0)
+        if batch and length + added > _NOTIFY_MAX_LEN:
+            try:
+                await bot.send_message(chat_id=ADMIN_CHAT, text=_NOTIFY_SEPARATOR.join(batch))
+            except TelegramError as e:
+                logger.error(f"Failed to flush admin notifications: {e}")
+            batch = []
+            length = 0
+            added = len(text)
+        batch.append(text)
+        length += added
+    if batch:
+        try:
+            await bot.send_message(chat_id=ADMIN_CHAT, text=_NOTIFY_SEPARATOR.join(batch))
+        except TelegramError as e:
+            logger.error(f"Failed to flush admin notifications: {e}")
+
+async def _notify_flusher(bot):
+    while True:
+        await asyncio.sleep(_NOTIFY_FLUSH_INTERVAL)
+        await _flush_notifications(bot)
+
+# Started with plain asyncio.create_task rather than application.create_task:
+# Application.stop() awaits every task registered through the latter, and the
+# flusher loops forever, so registering it there would hang every shutdown.
+_notify_task = None
+
+async def _start_notify_flusher(application):
+    global _notify_task
+    _notify_task = asyncio.create_task(_notify_flusher(application.bot))
+
+async def _stop_notify_flusher(application):
+    global _notify_task
+    if _notify_task is not None:
+        _notify_task.cancel()
+        try:
+            await _notify_task
+        except asyncio.CancelledError:
+            pass
+        _notify_task = None
+    # Deliver anything still queued before the HTTP clients are closed.
+    while not notify_queue.empty():
+        await _flush_notifications(application.bot)
+
+# --- Callback Routing ---
+# The callback data forms are "back_to_groups", "select_course_<id>" and
+# "contact_admin_<id>", so the first "_"-separated token identifies the
+# handler. Routing through one dict lookup avoids running every registered
+# pattern regex against every callback.
+_CALLBACK_ROUTES = {
+    "back": show_courses_menu,
+    "select": select_course,
+    "contact": contact_admin,
+}
+
+async def route_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    data = update.callback_query.data or ""
+    handler = _CALLBACK_ROUTES.get(data.split("_", 1)[0])
+    if handler is None:
+        logger.warning(f"Unhandled callback data: {data}")
+        await update.callback_query.answer()
+        return
+    await handler(update, context)
 
 # --- Main Function ---
 def main():
+    try:
+        import uvloop
+        uvloop.install()
+        logger.info("Using uvloop event loop")
+    except ImportError:
+        # uvloop isn't available on Windows; the default loop works fine.
+        pass
+
     web_server_thread = threading.Thread(target=run_web_server)
     web_server_thread.daemon = True
     web_server_thread.start()
 
-    application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    # Separate, larger pools for outbound API calls and getUpdates so
+    # concurrent handlers don't exhaust the default single-connection pool.
+    # HTTP/2 lets concurrent API calls multiplex over one kept-alive
+    # connection instead of paying a TLS handshake per socket.
+    request = BotRequest(
+        connection_pool_size=32,
+        pool_timeout=30,
+        connect_timeout=10,
+        read_timeout=30,
+        http_version="2",
+    )
+    get_updates_request = BotRequest(
+        connection_pool_size=4,
+        pool_timeout=30,
+        http_version="2",
+    )
+    application = (
+        Application.builder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .request(request)
+        .get_updates_request(get_updates_request)
+        .post_init(_start_notify_flusher)
+        .post_stop(_stop_notify_flusher)
+        # Throttle to Telegram's documented limits (30 msg/s overall,
+        # 20 msg/min per group) instead of tripping 429s and having
+        # retries hold pool connections.
+        .rate_limiter(AIORateLimiter(
+            overall_max_rate=30,
+            overall_time_period=1,
+            group_max_rate=20,
+            group_time_period=60,
+            max_retries=3
+        ))
+        .build()
+    )
 
-    application.add_handler(CommandHandler("start", start_command))
-    application.add_handler(CallbackQueryHandler(show_courses_menu, pattern="^back_to_groups$"))
-    application.add_handler(CallbackQueryHandler(select_course, pattern=r"^select_course_"))
-    application.add_handler(CallbackQueryHandler(contact_admin, pattern=r"^contact_admin_"))
+    # The dedup handler must stay blocking so ApplicationHandlerStop can
+    # cancel dispatch; the real handlers run concurrently so one user's
+    # slow send doesn't stall everyone else's callbacks.
+    application.add_handler(TypeHandler(Update, dedup_updates), group=-1)
+    application.add_handler(CommandHandler("start", start_command, block=False))
+    application.add_handler(CallbackQueryHandler(route_callback, block=False))
     application.add_error_handler(error_handler)
 
+    # Only commands and button presses are handled, so don't ask Telegram
+    # for edited messages, channel posts, polls, etc. — every unused update
+    # would just be bandwidth, JSON parsing, and a guaranteed handler miss.
+    allowed_updates = [Update.MESSAGE, Update.CALLBACK_QUERY]
+
     logger.info("Starting bot...")
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    if WEBHOOK_URL:
+        # Telegram pushes updates as they happen; no getUpdates poll loop,
+        # so idle HTTPS roundtrips and poll-interval latency go away.
+        application.run_webhook(
+            listen="0.0.0.0",
+            port=int(os.getenv("WEBHOOK_PORT", 8443)),
+            url_path=TELEGRAM_BOT_TOKEN,
+            webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{TELEGRAM_BOT_TOKEN}",
+            allowed_updates=allowed_updates
+        )
+    else:
+        application.run_polling(allowed_updates=allowed_updates)
 
 if __name__ == "__main__":
     main()